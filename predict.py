@@ -8,16 +8,27 @@ current_dir = os.path.dirname(os.path.abspath(__file__))
 sys.path.append(current_dir)
 
 # NOUVEAUX IMPORTS FACTORISÉS
-from src.utils import load_artifacts
+from src.utils import load_artifacts, load_temporal_matrices, get_current_version, get_version_paths
 from src.evaluation import get_user_history, get_cluster_vibe, calculate_rmse, format_tags
+from src.models import HybridReranker
 
 # Chemins
+ARTIFACTS_PATH = os.path.join(current_dir, 'artifacts')
 PROCESSED_PATH = os.path.join(current_dir, 'data/processed')
 MODELS_PATH = os.path.join(current_dir, 'models')
 
 def run_dashboard():
-    # 1. CHARGEMENT
-    matrix, mappings, tag_dict, hybrid, svd, content = load_artifacts(PROCESSED_PATH, MODELS_PATH)
+    # 1. CHARGEMENT (version publiée si elle existe, sinon anciens dossiers)
+    processed_path, models_path = PROCESSED_PATH, MODELS_PATH
+    version_id = get_current_version(ARTIFACTS_PATH)
+    if version_id is not None:
+        processed_path, models_path = get_version_paths(ARTIFACTS_PATH, version_id)
+        print(f"[INFO] Version des modèles : {version_id}")
+
+    matrix, mappings, tag_dict, hybrid, svd, content = load_artifacts(processed_path, models_path)
+    # Validation temporelle : les modèles ne voient que train, on évalue sur les notes futures
+    train_matrix, validation_matrix = load_temporal_matrices(processed_path)
+    if train_matrix is None: train_matrix = matrix
     
     user_labels = mappings['user_labels']
     movie_labels = mappings['movie_labels']
@@ -41,7 +52,7 @@ def run_dashboard():
         print(f" * {title} ({rating}/5)\n   Style : {tags}")
 
     try:
-        cluster_id = hybrid.model.predict(matrix[u_idx])[0]
+        cluster_id = hybrid.predict_cluster(matrix[u_idx])[0]
         vibe = get_cluster_vibe(hybrid, cluster_id, matrix, movie_labels)
         print(f"\nSON GROUPE (CLUSTER {cluster_id}) aime :\n > {', '.join(vibe)}")
     except: pass
@@ -50,7 +61,8 @@ def run_dashboard():
 
     # 4. MODÈLE HYBRIDE
     print("\n1. MODELE HYBRIDE")
-    rmse_hybrid = calculate_rmse(hybrid, 'hybrid', matrix, user_labels, user_to_idx)
+    rmse_hybrid = calculate_rmse(hybrid, 'hybrid', train_matrix, user_labels, user_to_idx,
+                                 eval_matrix=validation_matrix)
     print(f"[SCORE] RMSE : {rmse_hybrid:.4f}")
     
     recos = hybrid.recommend(test_user_id, matrix, user_to_idx, movie_labels, n_reco=5)
@@ -59,8 +71,9 @@ def run_dashboard():
 
     # 5. MODÈLE SVD
     print("\n2. MODELE SVD")
-    if svd.matrix_reconstructed is None: svd.fit(matrix)
-    rmse_svd = calculate_rmse(svd, 'svd', matrix, user_labels, user_to_idx)
+    if svd.matrix_reconstructed is None: svd.fit(train_matrix)
+    rmse_svd = calculate_rmse(svd, 'svd', train_matrix, user_labels, user_to_idx,
+                              eval_matrix=validation_matrix)
     print(f"[SCORE] RMSE : {rmse_svd:.4f}")
     
     recos_svd = svd.recommend(u_idx, movie_labels, n_reco=5)
@@ -78,5 +91,13 @@ def run_dashboard():
     else:
         print("   (Pas d'historique)")
 
+    # 7. RE-RANKING (FUSION DES TROIS MODÈLES)
+    print("\n4. RE-RANKING HYBRIDE (Fusion)")
+    reranker = HybridReranker(hybrid, svd, content).prepare(matrix, movie_labels)
+    recos_fused = reranker.recommend(u_idx, matrix, movie_labels, n_reco=5)
+    print(f"[LATENCE] {reranker.last_latency * 1000:.1f} ms")
+    for title, score in recos_fused:
+        print(f"   * {title} ({score:.2f})\n   {format_tags(title, tag_dict)}")
+
 if __name__ == "__main__":
     run_dashboard()
\ No newline at end of file
@@ -0,0 +1,46 @@
+import sys
+import os
+
+# Configuration Path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(current_dir)
+
+from src.serving import ModelServer
+from src.evaluation import format_tags
+
+ARTIFACTS_PATH = os.path.join(current_dir, 'artifacts')
+
+def run_server(poll_interval=30):
+    """
+    Serveur interactif : les modèles sont rechargés à chaud dès qu'un
+    nouvel entraînement (train.py) publie une version.
+    """
+    server = ModelServer(ARTIFACTS_PATH, poll_interval=poll_interval).start()
+    if server.version is None:
+        print("[ERREUR] Aucune version publiée. Lancez d'abord train.py.")
+        sys.exit(1)
+
+    print("Entrez un identifiant utilisateur (ou 'q' pour quitter).")
+    try:
+        while True:
+            raw = input(f"\n[v{server.version}] userId > ").strip()
+            if raw.lower() in ('q', 'quit', 'exit'): break
+            try:
+                user_id = int(raw)
+            except ValueError:
+                print("   Identifiant invalide.")
+                continue
+
+            state = server.snapshot()
+            recos = server.recommend(user_id, n_reco=5, state=state)
+            if not recos:
+                print("   Utilisateur inconnu.")
+            for title, score in recos:
+                print(f"   * {title} ({score:.2f})\n   {format_tags(title, state['tag_dict'])}")
+    except (KeyboardInterrupt, EOFError):
+        pass
+    finally:
+        server.stop()
+
+if __name__ == "__main__":
+    run_server()
@@ -1,2 +1,9 @@
 # src/data/__init__.py
-from .make_dataset import load_data, process_features
\ No newline at end of file
+from .make_dataset import (
+    load_data,
+    load_new_ratings,
+    process_features,
+    update_features,
+    build_temporal_matrices,
+    append_time_window
+)
\ No newline at end of file
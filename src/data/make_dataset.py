@@ -2,6 +2,7 @@
 import pandas as pd
 import numpy as np
 import os
+import shutil
 import pickle
 from scipy import sparse
 from scipy.sparse import csr_matrix
@@ -31,12 +32,223 @@ def load_data(raw_data_path='data/raw'):
     print(f"    Données chargées : {len(df_merged)} lignes.")
     return df_merged
 
-def process_features(df_clean, save_path='data/processed', raw_path='data/raw'):
+def _to_datetime(timestamps):
+    """Gère les deux formats MovieLens : texte (Kaggle) ou secondes Unix."""
+    if pd.api.types.is_numeric_dtype(timestamps):
+        return pd.to_datetime(timestamps, unit='s')
+    return pd.to_datetime(timestamps)
+
+def _valid_offset(ratings_path, offset):
+    """Un offset n'est réutilisable que si le fichier a seulement grandi et qu'il tombe en début de ligne."""
+    if not offset or offset > os.path.getsize(ratings_path):
+        return False
+    with open(ratings_path, 'rb') as f:
+        f.seek(offset - 1)
+        return f.read(1) == b'\n'
+
+def load_new_ratings(raw_data_path, since, offset=None, chunksize=1_000_000):
+    """
+    Charge les notes postérieures à `since` pour le ré-entraînement incrémental.
+    rating.csv étant alimenté en ajout seul, si `offset` (taille en octets déjà traitée)
+    est valide, seule la fin du fichier est lue. Sinon, le fichier entier est parcouru
+    par blocs et seule la nouvelle fenêtre est conservée.
+    Renvoie (DataFrame de la fenêtre, nouvel offset).
+    """
+    print(f"--- [Data] Chargement des notes postérieures au {since} ---")
+    ratings_path = os.path.join(raw_data_path, 'rating.csv')
+    movies_path = os.path.join(raw_data_path, 'movie.csv')
+    if not os.path.exists(ratings_path) or not os.path.exists(movies_path):
+        raise FileNotFoundError(f" Erreur : Fichiers introuvables dans {raw_data_path}")
+
+    # Taille relevée avant lecture : des lignes ajoutées pendant la lecture seront relues
+    # au prochain passage, puis écartées par le filtre sur `since`
+    new_offset = os.path.getsize(ratings_path)
+    with open(ratings_path, 'rb') as f:
+        columns = f.readline().decode().strip().split(',')
+        if _valid_offset(ratings_path, offset):
+            print(f"    Lecture à partir de l'octet {offset} (fichier en ajout seul).")
+            f.seek(offset)
+        else:
+            print("    Offset absent ou invalide : parcours complet du fichier.")
+
+        chunks = []
+        if f.tell() < new_offset:
+            for chunk in pd.read_csv(f, names=columns, header=None, chunksize=chunksize):
+                # Filtre de sécurité : ne garder que la nouvelle fenêtre
+                chunks.append(chunk[(_to_datetime(chunk['timestamp']) > since).values])
+    ratings = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=columns)
+
+    df_window = pd.merge(ratings, pd.read_csv(movies_path), on='movieId')
+    print(f"    Nouvelles lignes : {len(df_window)}.")
+    return df_window, new_offset
+
+def _to_days(timestamps):
+    """Dates -> jours depuis l'époque Unix (valeurs stockées dans la matrice des dates)."""
+    return (np.asarray(timestamps, dtype='datetime64[ns]') - np.datetime64(0, 'ns')) / np.timedelta64(1, 'D')
+
+def _from_days(days):
+    return pd.Timestamp(0) + pd.to_timedelta(days, unit='D')
+
+def _recency_weighted(ratings_matrix, timestamp_matrix, half_life_days):
+    """Notes pondérées par 0.5 ** (âge / demi-vie), l'âge étant mesuré depuis la note la plus récente."""
+    if timestamp_matrix.nnz == 0:
+        return None
+    weights = timestamp_matrix.copy()
+    weights.data = 0.5 ** ((timestamp_matrix.data.max() - timestamp_matrix.data) / half_life_days)
+    return ratings_matrix.multiply(weights).tocsr()
+
+def split_by_cutoff(ratings_matrix, timestamp_matrix, cutoff_days, half_life_days=None):
+    """
+    Sépare une matrice de notes selon sa matrice de dates (même structure creuse) :
+    'train' avant cutoff_days, 'validation' à partir de cutoff_days, et 'recency'
+    (notes train pondérées par 0.5 ** (âge / demi-vie)) si half_life_days est fourni.
+    'recency_full' applique la même pondération à toutes les notes (modèles publiés).
+    """
+    is_val = timestamp_matrix.copy()
+    is_val.data = (is_val.data >= cutoff_days).astype(np.float64)
+    is_val.eliminate_zeros()
+
+    validation = ratings_matrix.multiply(is_val).tocsr()
+    train = (ratings_matrix - validation).tocsr()
+    train.eliminate_zeros()
+
+    recency, recency_full = None, None
+    if half_life_days:
+        train_ts = (timestamp_matrix - timestamp_matrix.multiply(is_val)).tocsr()
+        train_ts.eliminate_zeros()
+        recency = _recency_weighted(train, train_ts, half_life_days)
+        recency_full = _recency_weighted(ratings_matrix, timestamp_matrix, half_life_days)
+
+    return {'train': train, 'validation': validation, 'recency': recency, 'recency_full': recency_full}
+
+def build_temporal_matrices(user_codes, movie_codes, ratings, timestamps, shape,
+                            validation_ratio=0.2, half_life_days=None):
+    """
+    Découpage temporel en une seule passe sur les données triées par date :
+    - 'train'      : notes antérieures à la date de coupure,
+    - 'validation' : notes les plus récentes (fraction validation_ratio),
+    - 'recency'    : notes d'entraînement pondérées par 0.5 ** (âge / demi-vie), si demandé,
+    - 'recency_full' : même pondération sur toutes les notes (modèles publiés),
+    - 'timestamps' : date (en jours) de chaque note, pour les mises à jour incrémentales.
+    """
+    days = _to_days(_to_datetime(pd.Series(timestamps)).values)
+    order = np.argsort(days, kind='stable')
+    u, m, r, days = (np.asarray(user_codes)[order], np.asarray(movie_codes)[order],
+                     np.asarray(ratings, dtype=np.float64)[order], days[order])
+
+    # Une seule note par couple (utilisateur, film) : la plus récente
+    keys = pd.Series(u.astype(np.int64) * shape[1] + m)
+    last = ~keys.duplicated(keep='last').values
+    cut = int(len(days) * (1 - validation_ratio))
+    cutoff_days = days[cut] if cut < len(days) else np.inf
+    u, m, r, days = u[last], m[last], r[last], days[last]
+
+    ratings_matrix = csr_matrix((r, (u, m)), shape=shape)
+    timestamp_matrix = csr_matrix((days, (u, m)), shape=shape)
+
+    temporal = split_by_cutoff(ratings_matrix, timestamp_matrix, cutoff_days, half_life_days)
+    temporal.update({
+        'timestamps': timestamp_matrix,
+        'time_cutoff': _from_days(min(cutoff_days, days[-1])),
+        'last_timestamp': _from_days(days.max())
+    })
+    return temporal
+
+def append_time_window(user_item_matrix, timestamp_matrix, df_window, mappings):
+    """
+    Ré-entraînement incrémental : n'intègre que les notes plus récentes que
+    mappings['last_timestamp'] (utilisateurs/films connus uniquement).
+    Une nouvelle note remplace l'ancienne pour le même couple (utilisateur, film).
+    Renvoie (matrice des notes, matrice des dates, nombre de notes ajoutées).
+    """
+    ts = _to_datetime(df_window['timestamp'])
+    window = df_window.assign(_ts=ts.values)[(ts > mappings['last_timestamp']).values]
+    # Plusieurs notes du même couple dans la fenêtre : seule la dernière compte
+    window = window.sort_values('_ts', kind='stable').drop_duplicates(['userId', 'title'], keep='last')
+
+    u = pd.Index(mappings['user_labels']).get_indexer(window['userId'])
+    m = pd.Index(mappings['movie_labels']).get_indexer(window['title'])
+    known = (u >= 0) & (m >= 0)
+    if not known.any():
+        return user_item_matrix, timestamp_matrix, 0
+
+    u, m = u[known], m[known]
+    shape = user_item_matrix.shape
+    new_ratings = csr_matrix((window['rating'].values[known], (u, m)), shape=shape)
+    new_days = csr_matrix((_to_days(window['_ts'].values[known]), (u, m)), shape=shape)
+
+    mask = csr_matrix((np.ones(len(u)), (u, m)), shape=shape)
+    updated = user_item_matrix - user_item_matrix.multiply(mask) + new_ratings
+    updated_days = timestamp_matrix - timestamp_matrix.multiply(mask) + new_days
+
+    mappings['last_timestamp'] = pd.Timestamp(window['_ts'].values[known].max())
+    print(f"    Fenêtre ajoutée : {len(u)} nouvelles notes.")
+    return csr_matrix(updated), csr_matrix(updated_days), len(u)
+
+def _save_temporal(save_path, temporal):
+    sparse.save_npz(os.path.join(save_path, 'train_matrix.npz'), temporal['train'])
+    sparse.save_npz(os.path.join(save_path, 'validation_matrix.npz'), temporal['validation'])
+    sparse.save_npz(os.path.join(save_path, 'timestamp_matrix.npz'), temporal['timestamps'])
+    if temporal['recency'] is not None:
+        sparse.save_npz(os.path.join(save_path, 'recency_matrix.npz'), temporal['recency'])
+
+def update_features(df_window, previous_path, save_path='data/processed', half_life_days=None,
+                    ratings_offset=None):
+    """
+    Ré-entraînement incrémental à partir des artefacts de la version précédente :
+    1. Ajoute la nouvelle fenêtre à la matrice (sans relire l'historique).
+    2. Le passé devient 'train', la nouvelle fenêtre devient 'validation'.
+    3. Sauvegarde matrices, mappings (nouveau last_timestamp) et tags.
+    Renvoie (None, None, None) s'il n'y a aucune nouvelle note exploitable.
+    """
+    print("--- [Data] Mise à jour incrémentale des features ---")
+    user_item_matrix = sparse.load_npz(os.path.join(previous_path, 'user_item_matrix.npz'))
+    timestamp_matrix = sparse.load_npz(os.path.join(previous_path, 'timestamp_matrix.npz'))
+    with open(os.path.join(previous_path, 'mappings.pkl'), 'rb') as f:
+        mappings = pickle.load(f)
+
+    cutoff = mappings['last_timestamp']
+    user_item_matrix, timestamp_matrix, n_added = append_time_window(
+        user_item_matrix, timestamp_matrix, df_window, mappings)
+    if n_added == 0:
+        print("    Aucune nouvelle note pour les utilisateurs/films connus.")
+        return None, None, None
+
+    # Strictement après l'ancienne dernière date : seule la nouvelle fenêtre va en validation
+    cutoff_days = np.nextafter(_to_days([cutoff])[0], np.inf)
+    temporal = split_by_cutoff(user_item_matrix, timestamp_matrix, cutoff_days, half_life_days)
+    temporal.update({
+        'timestamps': timestamp_matrix,
+        'time_cutoff': cutoff,
+        'last_timestamp': mappings['last_timestamp']
+    })
+    mappings['time_cutoff'] = cutoff
+    mappings['ratings_offset'] = ratings_offset
+    print(f"    Coupure au {cutoff} : "
+          f"{temporal['train'].nnz} notes train / {temporal['validation'].nnz} notes validation.")
+
+    os.makedirs(save_path, exist_ok=True)
+    sparse.save_npz(os.path.join(save_path, 'user_item_matrix.npz'), user_item_matrix)
+    _save_temporal(save_path, temporal)
+    with open(os.path.join(save_path, 'mappings.pkl'), 'wb') as f:
+        pickle.dump(mappings, f)
+
+    # Les tags ne dépendent pas des notes : on reprend ceux de la version précédente
+    tags_file = os.path.join(previous_path, 'movie_tags.pkl')
+    if os.path.exists(tags_file):
+        shutil.copy2(tags_file, os.path.join(save_path, 'movie_tags.pkl'))
+
+    return user_item_matrix, mappings, temporal
+
+def process_features(df_clean, save_path='data/processed', raw_path='data/raw',
+                     validation_ratio=0.2, half_life_days=None, return_temporal=False,
+                     ratings_offset=None):
     """
     1. Filtre les données (utilisateurs/films actifs).
     2. Crée la matrice sparse (Utilisateur-Film).
-    3. Traite les TAGS pour le Content-Based.
-    4. Sauvegarde le tout (.npz, .pkl).
+    3. Crée les matrices temporelles (train / validation / récence).
+    4. Traite les TAGS pour le Content-Based.
+    5. Sauvegarde le tout (.npz, .pkl).
     """
     print("--- [Data] Traitement des features & Tags ---")
 
@@ -63,6 +275,14 @@ def process_features(df_clean, save_path='data/processed', raw_path='data/raw'):
     user_item_matrix = csr_matrix((df_final['rating'], 
                                    (user_ids.cat.codes, movie_titles.cat.codes)))
 
+    # Découpage temporel (même indexation que la matrice complète)
+    print("   2. Découpage temporel train / validation...")
+    temporal = build_temporal_matrices(user_ids.cat.codes.values, movie_titles.cat.codes.values,
+                                       df_final['rating'].values, df_final['timestamp'],
+                                       user_item_matrix.shape, validation_ratio, half_life_days)
+    print(f"    Coupure au {temporal['time_cutoff']} : "
+          f"{temporal['train'].nnz} notes train / {temporal['validation'].nnz} notes validation.")
+
     # ==========================================
     # 2. SAUVEGARDE MATRICE & MAPPINGS
     # ==========================================
@@ -71,10 +291,15 @@ def process_features(df_clean, save_path='data/processed', raw_path='data/raw'):
     # Sauvegarde Matrice, Mappings, CSV propre
     
     sparse.save_npz(os.path.join(save_path, 'user_item_matrix.npz'), user_item_matrix)
+    _save_temporal(save_path, temporal)
     
     mappings = {
         'user_labels': user_ids.cat.categories,
-        'movie_labels': movie_titles.cat.categories
+        'movie_labels': movie_titles.cat.categories,
+        'time_cutoff': temporal['time_cutoff'],
+        'last_timestamp': temporal['last_timestamp'],
+        # Octets de rating.csv déjà intégrés (lecture incrémentale)
+        'ratings_offset': ratings_offset
     }
     with open(os.path.join(save_path, 'mappings.pkl'), 'wb') as f:
         pickle.dump(mappings, f)
@@ -84,7 +309,7 @@ def process_features(df_clean, save_path='data/processed', raw_path='data/raw'):
     # ==========================================
     # 3. TRAITEMENT DES TAGS (Pour Content-Based)
     # ==========================================
-    print("   2. Traitement des Tags...")
+    print("   3. Traitement des Tags...")
     tag_dict = {}
     tags_file = os.path.join(raw_path, 'tag.csv')
     movies_file = os.path.join(raw_path, 'movie.csv')
@@ -118,4 +343,6 @@ def process_features(df_clean, save_path='data/processed', raw_path='data/raw'):
     else:
         print("    Fichiers tags manquants.")
 
+    if return_temporal:
+        return user_item_matrix, mappings, temporal
     return user_item_matrix, mappings
\ No newline at end of file
@@ -1,7 +1,10 @@
 # src/evaluation.py
+import time
 import numpy as np
+import pandas as pd
 from math import sqrt
 from sklearn.metrics import mean_squared_error
+from src.models import KMeansRecommender
 
 def get_user_history(user_idx, matrix, movie_labels, tag_dict, n=3):
     """Récupère les n films les mieux notés par l'utilisateur."""
@@ -34,27 +37,42 @@ def get_cluster_vibe(model, cluster_id, matrix, movie_labels, n_top=3):
     
     return [movie_labels[i] for i in top_indices]
 
-def calculate_rmse(model, model_type, user_item_matrix, user_ids, user_to_idx, n_tests=50):
-    """Calcule le RMSE sur un échantillon."""
+def calculate_rmse(model, model_type, user_item_matrix, user_ids, user_to_idx, n_tests=50,
+                   eval_matrix=None, random_state=None):
+    """
+    Calcule le RMSE sur un échantillon.
+    Si eval_matrix est fourni (validation temporelle), les notes à prédire viennent
+    de eval_matrix et les prédictions ne s'appuient que sur user_item_matrix (train).
+    """
     # Note : J'ai factorisé la logique de sélection aléatoire ici
+    rng = np.random.default_rng(random_state)
     y_true, y_pred = [], []
-    test_users = np.random.choice(user_ids, n_tests)
+    truth_matrix = user_item_matrix
+    if eval_matrix is not None:
+        truth_matrix = eval_matrix
+        # On ne tire que des utilisateurs ayant des notes dans la période de validation
+        user_ids = np.asarray(user_ids)[eval_matrix.getnnz(axis=1) > 0]
+        if len(user_ids) == 0: return 0.0
+    test_users = rng.choice(np.asarray(user_ids), n_tests)
     
     for u_id in test_users:
         if u_id not in user_to_idx: continue
         u_idx = user_to_idx[u_id]
-        ratings = user_item_matrix[u_idx].toarray().flatten()
+        ratings = truth_matrix[u_idx].toarray().flatten()
         movies_rated = np.where(ratings > 0)[0]
         if len(movies_rated) < 2: continue
         
-        sample = np.random.choice(movies_rated, min(5, len(movies_rated)))
+        sample = rng.choice(movies_rated, min(5, len(movies_rated)))
         
         # Logique spécifique par modèle
         if model_type == 'hybrid':
             try:
                 u_cluster = model.clusters[model.clusters['userId'] == u_id]['cluster'].values[0]
                 cluster_users = model.clusters[model.clusters['cluster'] == u_cluster]['userId'].values
-                cluster_indices = [user_to_idx[u] for u in cluster_users if u in user_to_idx]
+                # On exclut l'utilisateur testé : sa propre note ne doit pas entrer dans la moyenne
+                cluster_indices = [user_to_idx[u] for u in cluster_users
+                                   if u in user_to_idx and user_to_idx[u] != u_idx]
+                if not cluster_indices: continue
                 
                 for m_idx in sample:
                     vals = user_item_matrix[cluster_indices, m_idx].toarray().flatten()
@@ -73,6 +91,49 @@ def calculate_rmse(model, model_type, user_item_matrix, user_ids, user_to_idx, n
     if not y_true: return 0.0
     return sqrt(mean_squared_error(y_true, y_pred))
 
+def evaluate_cluster_tradeoff(user_item_matrix, user_ids, movie_labels, k_values, n_tests=50,
+                              eval_matrix=None, fit_matrix=None, baseline_k=4, random_state=42):
+    """
+    Compare précision (RMSE) et latence du modèle hybride pour plusieurs K.
+    Plus K est grand, plus les segments sont petits et la recherche de voisins rapide.
+    fit_matrix : matrice de clustering du modèle de production (par défaut user_item_matrix).
+    baseline_k : ajoute une ligne de référence avec l'ancien backend KMeans complet.
+    """
+    if fit_matrix is None: fit_matrix = user_item_matrix
+    user_to_idx = {u: i for i, u in enumerate(user_ids)}
+    configs = [('minibatch', k) for k in k_values]
+    if baseline_k: configs.insert(0, ('kmeans', baseline_k))
+
+    results = []
+    for backend, k in configs:
+        if k >= len(user_ids): continue
+        start = time.perf_counter()
+        model = KMeansRecommender(n_clusters=k, backend=backend)
+        model.fit(fit_matrix, user_ids)
+        fit_time = time.perf_counter() - start
+
+        # Mêmes utilisateurs tirés pour chaque K (comparaison équitable)
+        rmse = calculate_rmse(model, 'hybrid', user_item_matrix, user_ids, user_to_idx,
+                              n_tests=n_tests, eval_matrix=eval_matrix, random_state=random_state)
+
+        rng = np.random.default_rng(random_state)
+        sample = rng.choice(np.asarray(user_ids), min(n_tests, len(user_ids)), replace=False)
+        start = time.perf_counter()
+        for u_id in sample:
+            model.recommend(u_id, user_item_matrix, user_to_idx, movie_labels, n_reco=5)
+        latency_ms = (time.perf_counter() - start) / len(sample) * 1000
+
+        results.append({
+            'backend': backend,
+            'k': k,
+            'rmse': rmse,
+            'latency_ms': latency_ms,
+            'fit_time_s': fit_time,
+            'mean_segment_size': len(user_ids) / k
+        })
+        print(f"    {backend:9s} K={k:4d} | RMSE {rmse:.4f} | {latency_ms:.1f} ms/reco | fit {fit_time:.1f} s")
+    return pd.DataFrame(results)
+
 def format_tags(title, tag_dict):
     tags = tag_dict.get(title, [])
     if not tags: return ""
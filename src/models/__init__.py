@@ -1,4 +1,5 @@
 # src/models/__init__.py
 from .kmeans import KMeansRecommender
 from .truncated_svd import SVDRecommender
-from .TF_IDF import TFIDFRecommender
\ No newline at end of file
+from .TF_IDF import TFIDFRecommender
+from .hybrid_reranker import HybridReranker
@@ -0,0 +1,149 @@
+import time
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+class HybridReranker:
+    """
+    Étape de re-ranking qui fusionne les trois modèles (Hybride, SVD, Content-Based).
+    Les candidats viennent de sources peu coûteuses (top SVD, top du cluster,
+    voisins TF-IDF des films aimés), puis l'union est notée en un seul calcul
+    vectorisé, avec pénalités de diversité et de popularité (nouveauté).
+    """
+    def __init__(self, hybrid, svd, content, weights=None, n_candidates=100,
+                 diversity_penalty=0.3, novelty_weight=0.1, latency_budget=0.2, max_liked=50):
+        self.hybrid = hybrid
+        self.svd = svd
+        self.content = content
+        # Les poids fournis complètent ceux par défaut (un dict partiel est accepté)
+        self.weights = {'hybrid': 0.4, 'svd': 0.4, 'content': 0.2, **(weights or {})}
+        self.n_candidates = n_candidates
+        self.diversity_penalty = diversity_penalty
+        self.novelty_weight = novelty_weight
+        self.latency_budget = latency_budget  # en secondes
+        self.max_liked = max_liked  # films aimés utilisés pour la source Content-Based
+        self.cluster_means = None
+        self.cluster_top = None
+        self.item_tfidf = None
+        self.novelty = None
+        self.last_latency = None
+
+    def prepare(self, user_item_matrix, movie_labels):
+        """Pré-calcule les tables partagées par tous les utilisateurs (une seule fois)."""
+        print("   [Re-ranking] Pré-calcul des moyennes par cluster et des vecteurs TF-IDF...")
+        n_users, n_items = user_item_matrix.shape
+        labels = np.asarray(self.hybrid.model.labels_)
+        n_clusters = labels.max() + 1
+
+        # 1. Moyenne des notes par (cluster, film) via une matrice indicatrice
+        indicator = sparse.csr_matrix((np.ones(n_users), (labels, np.arange(n_users))),
+                                      shape=(n_clusters, n_users))
+        sums = (indicator @ user_item_matrix).toarray()
+        counts = (indicator @ (user_item_matrix > 0).astype(np.float32)).toarray()
+        self.cluster_means = np.divide(sums, counts, out=np.zeros_like(sums), where=counts > 0)
+
+        # Top films par cluster (populaires ET bien notés dans le groupe)
+        cluster_scores = self.cluster_means * np.log1p(counts)
+        k = min(self.n_candidates, n_items)
+        self.cluster_top = np.argpartition(-cluster_scores, k - 1, axis=1)[:, :k]
+
+        # 2. Alignement des lignes TF-IDF sur les colonnes de la matrice
+        titles = pd.Series(self.content.movies_df.index, index=self.content.movies_df['title'])
+        titles = titles[~titles.index.duplicated()]
+        rows = titles.reindex(movie_labels)
+        found = rows.notna().values
+        aligned = self.content.tfidf_matrix[rows.fillna(0).astype(int).values]
+        # Les films sans métadonnées ont un vecteur nul (similarité 0)
+        self.item_tfidf = sparse.diags(found.astype(np.float64)) @ aligned
+        self.item_tfidf = self.item_tfidf.tocsr()
+
+        # 3. Nouveauté : 1 pour les films rares, 0 pour les plus populaires
+        popularity = np.log1p(user_item_matrix.getnnz(axis=0))
+        self.novelty = 1.0 - popularity / max(popularity.max(), 1e-9)
+        return self
+
+    def _svd_scores(self, user_idx, user_row):
+        if self.svd.matrix_reconstructed is not None:
+            return np.asarray(self.svd.matrix_reconstructed[user_idx]).flatten()
+        # Projection d'une seule ligne (évite de reconstruire toute la matrice)
+        return self.svd.model.inverse_transform(self.svd.model.transform(user_row)).flatten()
+
+    def _over_budget(self, start):
+        return time.perf_counter() - start > self.latency_budget
+
+    @staticmethod
+    def _normalize(x):
+        span = x.max() - x.min()
+        if span <= 0:
+            return np.zeros_like(x)
+        return (x - x.min()) / span
+
+    def recommend(self, user_idx, user_item_matrix, movie_labels, n_reco=10):
+        if self.cluster_means is None:
+            self.prepare(user_item_matrix, movie_labels)
+
+        start = time.perf_counter()
+        user_row = user_item_matrix[user_idx]
+        seen = np.zeros(user_item_matrix.shape[1], dtype=bool)
+        seen[user_row.indices] = True
+        k = min(self.n_candidates, user_item_matrix.shape[1])
+
+        # 1. GÉNÉRATION DES CANDIDATS (de la source la moins chère à la plus chère)
+        cluster_id = self.hybrid.model.labels_[user_idx]
+        cluster_cands = self.cluster_top[cluster_id]
+
+        svd_all = self._svd_scores(user_idx, user_row)
+        svd_all[seen] = -np.inf
+        svd_cands = np.argpartition(-svd_all, k - 1)[:k]
+
+        # Source Content-Based : ignorée si le budget est déjà consommé
+        content_all = np.zeros(user_item_matrix.shape[1])
+        content_cands = np.array([], dtype=int)
+        liked_mask = user_row.data >= 4.0
+        if liked_mask.any() and not self._over_budget(start):
+            # On plafonne aux max_liked films les mieux notés (coût du produit creux borné)
+            liked_order = np.argsort(-user_row.data[liked_mask], kind='stable')[:self.max_liked]
+            liked = user_row.indices[liked_mask][liked_order]
+            # Similarité maximale avec les films aimés (un seul produit creux)
+            content_all = (self.item_tfidf[liked] @ self.item_tfidf.T).max(axis=0).toarray().flatten()
+            content_all[seen] = -np.inf
+            content_cands = np.argpartition(-content_all, k - 1)[:k]
+
+        candidates = np.union1d(np.union1d(svd_cands, cluster_cands), content_cands)
+        candidates = candidates[~seen[candidates]]
+        if len(candidates) == 0:
+            self.last_latency = time.perf_counter() - start
+            return []
+
+        # 2. SCORE FUSIONNÉ (vectorisé sur toute l'union)
+        scores = (self.weights['hybrid'] * self._normalize(self.cluster_means[cluster_id, candidates])
+                  + self.weights['svd'] * self._normalize(svd_all[candidates])
+                  + self.weights['content'] * self._normalize(content_all[candidates])
+                  + self.novelty_weight * self.novelty[candidates])
+
+        # 3. SÉLECTION GLOUTONNE AVEC PÉNALITÉ DE DIVERSITÉ (type MMR)
+        n_reco = min(n_reco, len(candidates))
+        pool = np.argsort(scores)[::-1][:max(5 * n_reco, 50)]
+        cand_vecs = self.item_tfidf[candidates[pool]]
+        sim = (cand_vecs @ cand_vecs.T).toarray()
+
+        # On renvoie le score ajusté (celui utilisé pour la sélection) : il est décroissant
+        selected, selected_scores = [], []
+        max_sim = np.zeros(len(pool))
+        available = np.ones(len(pool), dtype=bool)
+        for _ in range(n_reco):
+            adjusted = np.where(available, scores[pool] - self.diversity_penalty * max_sim, -np.inf)
+            if self._over_budget(start):
+                # Budget dépassé : on complète sans recalculer la pénalité de diversité
+                rest = np.argsort(adjusted)[::-1][:n_reco - len(selected)]
+                selected.extend(rest)
+                selected_scores.extend(adjusted[rest])
+                break
+            best = int(adjusted.argmax())
+            selected.append(best)
+            selected_scores.append(adjusted[best])
+            available[best] = False
+            max_sim = np.maximum(max_sim, sim[best])
+
+        self.last_latency = time.perf_counter() - start
+        return [(movie_labels[candidates[pool[i]]], score) for i, score in zip(selected, selected_scores)]
@@ -2,22 +2,46 @@ import os
 import joblib
 import pandas as pd
 import numpy as np
-from sklearn.cluster import KMeans
+from sklearn.cluster import KMeans, MiniBatchKMeans
+from sklearn.decomposition import TruncatedSVD
 from sklearn.metrics.pairwise import cosine_similarity
+from sklearn.preprocessing import normalize
 
 class KMeansRecommender:
     """
     Système de recommandation basé sur le Clustering K-Means.
     Groupe les utilisateurs similaires pour affiner les prédictions (Approche Hybride).
+
+    backend='kmeans'    : KMeans complet sur la matrice creuse brute (peu de clusters).
+    backend='minibatch' : MiniBatchKMeans sur les embeddings SVD des utilisateurs,
+                          adapté à plusieurs centaines de clusters (segments plus fins).
     """
-    def __init__(self, n_clusters=4):
+    def __init__(self, n_clusters=4, backend='kmeans', n_components=50, batch_size=2048):
         self.n_clusters = n_clusters
-        self.model = KMeans(n_clusters=n_clusters, random_state=42, n_init=10)
+        self.backend = backend
+        if backend == 'minibatch':
+            self.embedder = TruncatedSVD(n_components=n_components, random_state=42)
+            self.model = MiniBatchKMeans(n_clusters=n_clusters, random_state=42,
+                                         batch_size=batch_size, n_init=3)
+        elif backend == 'kmeans':
+            self.embedder = None
+            self.model = KMeans(n_clusters=n_clusters, random_state=42, n_init=10)
+        else:
+            raise ValueError(f"Backend de clustering inconnu : {backend}")
         self.clusters = None
-        
+
+    def _embed(self, user_rows, fit=False):
+        """Projette les utilisateurs dans l'espace de clustering (SVD normalisée ou brut)."""
+        embedder = getattr(self, 'embedder', None)
+        if embedder is None:
+            return user_rows
+        reduced = embedder.fit_transform(user_rows) if fit else embedder.transform(user_rows)
+        # Normalisation L2 : on regroupe par goûts, pas par nombre de notes
+        return normalize(reduced)
+
     def fit(self, user_item_matrix, user_ids):
-        print(f"   [KMeans] Entraînement avec {self.n_clusters} clusters...")
-        self.model.fit(user_item_matrix)
+        print(f"   [KMeans] Entraînement avec {self.n_clusters} clusters (backend {self.backend})...")
+        self.model.fit(self._embed(user_item_matrix, fit=True))
         
         # On stocke le mapping User -> Cluster
         self.clusters = pd.DataFrame({
@@ -26,6 +50,10 @@ class KMeansRecommender:
         })
         return self
 
+    def predict_cluster(self, user_rows):
+        """Renvoie le(s) cluster(s) des lignes utilisateurs (matrice creuse)."""
+        return self.model.predict(self._embed(user_rows))
+
     def recommend(self, user_id, user_item_matrix, user_to_idx, movie_labels, n_reco=5):
         # 1. Trouver le cluster de l'utilisateur
         try:
@@ -48,6 +76,7 @@ class KMeansRecommender:
         # Similarité Cosinus
         sims = cosine_similarity(sub_matrix[target_rel_idx], sub_matrix).flatten()
         top_users = sims.argsort()[-51:-1] # Les 50 voisins les plus proches
+        if len(top_users) == 0: return [] # Cluster réduit à l'utilisateur seul
         
         # Prédiction par moyenne
         preds = sub_matrix[top_users].mean(axis=0)
@@ -0,0 +1,91 @@
+# src/serving.py
+import threading
+import traceback
+from src.utils import load_artifacts, get_current_version, get_version_paths
+from src.models import HybridReranker
+
+class ModelServer:
+    """
+    Serveur de modèles avec rechargement à chaud (zero-downtime).
+    Un thread de fond surveille le pointeur CURRENT ; une nouvelle version est
+    chargée et préparée en arrière-plan pendant que l'ancienne continue de servir,
+    puis la bascule se fait par simple remplacement de référence (atomique).
+    """
+    def __init__(self, artifacts_root, poll_interval=30):
+        self.artifacts_root = artifacts_root
+        self.poll_interval = poll_interval
+        self._state = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def version(self):
+        state = self._state
+        return state['version'] if state else None
+
+    def snapshot(self):
+        """État cohérent (matrice + mappings + modèles d'une même version)."""
+        return self._state
+
+    def _load_version(self, version_id):
+        processed_path, models_path = get_version_paths(self.artifacts_root, version_id)
+        matrix, mappings, tag_dict, hybrid, svd, content = load_artifacts(
+            processed_path, models_path, exit_on_error=False)
+
+        # Pré-calculs faits AVANT la bascule : pas de pic de latence au premier appel
+        reranker = HybridReranker(hybrid, svd, content).prepare(matrix, mappings['movie_labels'])
+        return {
+            'version': version_id,
+            'matrix': matrix,
+            'mappings': mappings,
+            'tag_dict': tag_dict,
+            'user_to_idx': {u: i for i, u in enumerate(mappings['user_labels'])},
+            'hybrid': hybrid,
+            'svd': svd,
+            'content': content,
+            'reranker': reranker
+        }
+
+    def refresh(self):
+        """Charge la version courante si elle a changé. Renvoie True en cas de bascule."""
+        version_id = get_current_version(self.artifacts_root)
+        if version_id is None or version_id == self.version:
+            return False
+        try:
+            new_state = self._load_version(version_id)
+        except Exception:
+            # On garde l'ancienne version en service et on réessaiera au prochain cycle
+            print(f"[ERREUR] Échec du chargement de la version {version_id} :")
+            traceback.print_exc()
+            return False
+        self._state = new_state
+        print(f"[INFO] Bascule vers la version {version_id}.")
+        return True
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_interval):
+            self.refresh()
+
+    def start(self):
+        """Chargement initial (bloquant) puis surveillance en arrière-plan."""
+        self.refresh()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch, name='model-watcher', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def recommend(self, user_id, n_reco=5, state=None):
+        """Recommandations fusionnées pour un utilisateur, sur un état figé."""
+        state = state or self._state
+        if state is None:
+            raise Exception("Aucune version de modèle publiée !")
+        u_idx = state['user_to_idx'].get(user_id)
+        if u_idx is None:
+            return []
+        return state['reranker'].recommend(u_idx, state['matrix'], state['mappings']['movie_labels'], n_reco)
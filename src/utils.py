@@ -1,11 +1,23 @@
 # src/utils.py
 import os
 import sys
+import time
+import uuid
+import shutil
 import joblib
 import pickle
 from scipy import sparse
 
-def load_artifacts(processed_path, models_path):
+# Fichiers indispensables à une version publiable (chemins relatifs au dossier de version)
+REQUIRED_ARTIFACTS = [
+    'processed/user_item_matrix.npz',
+    'processed/mappings.pkl',
+    'models/kmeans_model.pkl',
+    'models/svd_model.pkl',
+    'models/TF-IDF_model.pkl'
+]
+
+def load_artifacts(processed_path, models_path, exit_on_error=True):
     """Charge les matrices et les modèles."""
     print("[INFO] Chargement des artefacts...")
     try:
@@ -29,4 +41,115 @@ def load_artifacts(processed_path, models_path):
         
     except FileNotFoundError as e:
         print(f"[ERREUR] Fichier manquant : {e}")
-        sys.exit(1)
\ No newline at end of file
+        if not exit_on_error: raise
+        sys.exit(1)
+
+def load_temporal_matrices(processed_path):
+    """Charge les matrices train / validation (découpage temporel) si elles existent."""
+    train_path = os.path.join(processed_path, 'train_matrix.npz')
+    val_path = os.path.join(processed_path, 'validation_matrix.npz')
+    if not os.path.exists(train_path) or not os.path.exists(val_path):
+        return None, None
+    return sparse.load_npz(train_path), sparse.load_npz(val_path)
+
+
+# ==========================================
+# VERSIONS D'ARTEFACTS (publication atomique)
+# ==========================================
+# artifacts/
+# ├── CURRENT                 # Pointeur : identifiant de la version servie
+# └── versions/
+#     ├── 20240101-120000-1a2b3c4d/     # processed/ + models/ d'un entraînement complet
+#     └── 20240102-120000-5e6f7a8b.tmp  # Entraînement en cours (jamais lu par le serving)
+
+# Longueur du préfixe horodaté des identifiants (AAAAMMJJ-HHMMSS)
+_VERSION_TIME_LEN = 15
+
+def create_version(artifacts_root):
+    """Crée un dossier de travail pour un nouvel entraînement. Renvoie (version_id, chemin)."""
+    # Suffixe aléatoire : deux entraînements lancés dans la même seconde ne se gênent pas
+    version_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+    staging_dir = os.path.join(artifacts_root, 'versions', version_id + '.tmp')
+    os.makedirs(os.path.join(staging_dir, 'processed'))
+    os.makedirs(os.path.join(staging_dir, 'models'))
+    return version_id, staging_dir
+
+def get_current_version(artifacts_root):
+    """Lit le pointeur CURRENT (None si aucune version publiée)."""
+    pointer = os.path.join(artifacts_root, 'CURRENT')
+    if not os.path.exists(pointer):
+        return None
+    with open(pointer) as f:
+        return f.read().strip() or None
+
+def get_version_paths(artifacts_root, version_id):
+    """Renvoie (processed_path, models_path) d'une version publiée."""
+    version_dir = os.path.join(artifacts_root, 'versions', version_id)
+    return os.path.join(version_dir, 'processed'), os.path.join(version_dir, 'models')
+
+def discard_version(artifacts_root, version_id):
+    """Supprime le dossier de travail d'une version non publiée."""
+    staging_dir = os.path.join(artifacts_root, 'versions', version_id + '.tmp')
+    shutil.rmtree(staging_dir, ignore_errors=True)
+
+def _last_modified(path):
+    """Date de dernière écriture dans une arborescence (dossier compris)."""
+    latest = os.path.getmtime(path)
+    for root, dirs, files in os.walk(path):
+        for name in dirs + files:
+            try:
+                latest = max(latest, os.path.getmtime(os.path.join(root, name)))
+            except OSError:
+                continue
+    return latest
+
+def publish_version(artifacts_root, version_id, keep_last=3, stale_after_hours=24):
+    """
+    Publie une version complète : renommage du dossier de travail, puis
+    bascule atomique du pointeur CURRENT (os.replace). Un lecteur voit donc
+    soit l'ancienne version, soit la nouvelle, jamais un mélange des deux.
+    Une version plus ancienne que celle en service est refusée (ValueError).
+    """
+    versions_dir = os.path.join(artifacts_root, 'versions')
+    staging_dir = os.path.join(versions_dir, version_id + '.tmp')
+
+    missing = [a for a in REQUIRED_ARTIFACTS if not os.path.exists(os.path.join(staging_dir, a))]
+    if missing:
+        discard_version(artifacts_root, version_id)
+        raise FileNotFoundError(f"Version {version_id} incomplète : {', '.join(missing)}")
+
+    # Un entraînement démarré avant la version en service ne doit pas faire reculer CURRENT
+    current = get_current_version(artifacts_root)
+    if current is not None and version_id[:_VERSION_TIME_LEN] < current[:_VERSION_TIME_LEN]:
+        discard_version(artifacts_root, version_id)
+        raise ValueError(f"Version {version_id} plus ancienne que la version en service {current}")
+
+    os.rename(staging_dir, os.path.join(versions_dir, version_id))
+
+    tmp_pointer = os.path.join(artifacts_root, f'CURRENT.{version_id}.tmp')
+    with open(tmp_pointer, 'w') as f:
+        f.write(version_id)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_pointer, os.path.join(artifacts_root, 'CURRENT'))
+    print(f"[INFO] Version {version_id} publiée.")
+
+    # Nettoyage des anciennes versions
+    entries = os.listdir(versions_dir)
+    published = sorted(v for v in entries if not v.endswith('.tmp'))
+    for old in published[:-keep_last]:
+        if old != version_id:
+            shutil.rmtree(os.path.join(versions_dir, old), ignore_errors=True)
+
+    # Dossiers .tmp sans écriture depuis stale_after_hours : entraînements interrompus.
+    # Les entraînements encore actifs (écritures récentes) sont laissés intacts.
+    stale_before = time.time() - stale_after_hours * 3600
+    for staging in entries:
+        staging_path = os.path.join(versions_dir, staging)
+        if not staging.endswith('.tmp') or staging == version_id + '.tmp':
+            continue
+        try:
+            if _last_modified(staging_path) < stale_before:
+                shutil.rmtree(staging_path, ignore_errors=True)
+        except OSError:
+            continue
@@ -5,5 +5,6 @@ from .plots import (
     plot_svd_variance, 
     plot_top_tags,
     plot_rating_distribution,
-    plot_long_tail
+    plot_long_tail,
+    plot_cluster_tradeoff
 )
\ No newline at end of file
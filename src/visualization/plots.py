@@ -135,4 +135,35 @@ def plot_long_tail(df, save_dir='reports/figures'):
     save_path = os.path.join(save_dir, 'long_tail_popularity.png')
     plt.savefig(save_path, dpi=300)
     plt.close()
-    print(f"   Graphique Stats sauvegardé : {save_path}")
\ No newline at end of file
+    print(f"   Graphique Stats sauvegardé : {save_path}")
+
+def plot_cluster_tradeoff(tradeoff_df, save_dir='reports/figures'):
+    """
+    Affiche le compromis précision / latence du modèle hybride selon le nombre de clusters.
+    La référence KMeans complet (backend 'kmeans') est tracée en points isolés.
+    """
+    os.makedirs(save_dir, exist_ok=True)
+
+    minibatch = tradeoff_df[tradeoff_df['backend'] == 'minibatch']
+    baseline = tradeoff_df[tradeoff_df['backend'] == 'kmeans']
+
+    fig, ax1 = plt.subplots(figsize=(10, 6))
+    ax1.plot(minibatch['k'], minibatch['rmse'], 'bo-', markersize=8, label='RMSE (MiniBatch)')
+    ax1.plot(baseline['k'], baseline['rmse'], 'b*', markersize=14, label='RMSE (KMeans complet)')
+    ax1.set_xlabel('Nombre de Clusters (K)')
+    ax1.set_ylabel('RMSE', color='blue')
+
+    ax2 = ax1.twinx()
+    ax2.plot(minibatch['k'], minibatch['latency_ms'], 'r-s', markersize=8, label='Latence (MiniBatch)')
+    ax2.plot(baseline['k'], baseline['latency_ms'], 'r*', markersize=14, label='Latence (KMeans complet)')
+    ax2.set_ylabel('Latence par recommandation (ms)', color='red')
+    ax2.grid(False)
+
+    handles = ax1.get_legend_handles_labels()[0] + ax2.get_legend_handles_labels()[0]
+    ax1.legend(handles=handles, loc='upper center')
+    plt.title('Compromis Précision / Latence selon K (MiniBatchKMeans vs KMeans)')
+
+    save_path = os.path.join(save_dir, 'cluster_tradeoff.png')
+    plt.savefig(save_path, dpi=300)
+    plt.close()
+    print(f"    Graphique sauvegardé : {save_path}")
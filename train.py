@@ -1,5 +1,6 @@
 import sys
 import os
+import pickle
 import pandas as pd
 from sklearn.cluster import MiniBatchKMeans
 
@@ -7,25 +8,48 @@ from sklearn.cluster import MiniBatchKMeans
 current_dir = os.path.dirname(os.path.abspath(__file__))
 sys.path.append(current_dir)
 
-from src.data import load_data, process_features
+from src.data import load_data, load_new_ratings, process_features, update_features
 from src.models import KMeansRecommender, SVDRecommender, TFIDFRecommender
+from src.evaluation import evaluate_cluster_tradeoff, calculate_rmse
+from src.utils import create_version, publish_version, discard_version, get_current_version, get_version_paths
 from src.visualization import (
     plot_elbow_curve, 
     plot_clusters_2d, 
     plot_svd_variance, 
     plot_top_tags, 
     plot_rating_distribution, 
-    plot_long_tail
+    plot_long_tail,
+    plot_cluster_tradeoff
 )
 
-def main():
+# Segments fins : MiniBatchKMeans sur embeddings SVD (cf. rapport cluster_tradeoff)
+HYBRID_N_CLUSTERS = 200
+TRADEOFF_K_VALUES = [4, 25, 50, 100, 200, 400]
+
+# Validation temporelle : les 20 % de notes les plus récentes servent d'évaluation
+VALIDATION_RATIO = 0.2
+# Demi-vie (jours) de la matrice pondérée par récence, utilisée pour le clustering
+HALF_LIFE_DAYS = 365
+
+def main(incremental=False):
     print("\nDÉMARRAGE DU PIPELINE D'ENTRAÎNEMENT (ORGANISÉ)")
     print("="*60)
     
     # Définition des dossiers
     raw_path = os.path.join(current_dir, 'data/raw')
-    processed_path = os.path.join(current_dir, 'data/processed')
-    models_path = os.path.join(current_dir, 'models')
+    artifacts_root = os.path.join(current_dir, 'artifacts')
+
+    # Mode incrémental : on repart de la version publiée et on n'ajoute que la nouvelle fenêtre
+    previous_version = get_current_version(artifacts_root) if incremental else None
+    if incremental and previous_version is None:
+        print(" Aucune version publiée : ré-entraînement complet.")
+        incremental = False
+
+    # Nouvelle version isolée : les lecteurs continuent d'utiliser la version publiée
+    version_id, version_dir = create_version(artifacts_root)
+    processed_path = os.path.join(version_dir, 'processed')
+    models_path = os.path.join(version_dir, 'models')
+    print(f" Version en préparation : {version_id}")
     
     # --- DÉFINITION DES DOSSIERS GRAPHIQUES ---
     figures_root = os.path.join(current_dir, 'reports/figures')
@@ -35,50 +59,111 @@ def main():
     svd_figs = os.path.join(figures_root, 'svd')
     content_figs = os.path.join(figures_root, 'content_based')
     
+    if incremental:
+        # ---------------------------------------------------------
+        # ÉTAPES 1-2 (INCRÉMENTAL) : NOUVELLE FENÊTRE UNIQUEMENT
+        # ---------------------------------------------------------
+        print(f"\nÉTAPES 1-2 : Mise à jour incrémentale depuis la version {previous_version}")
+        previous_processed, _ = get_version_paths(artifacts_root, previous_version)
+        with open(os.path.join(previous_processed, 'mappings.pkl'), 'rb') as f:
+            previous_mappings = pickle.load(f)
+        df_window, ratings_offset = load_new_ratings(raw_path, previous_mappings['last_timestamp'],
+                                                     offset=previous_mappings.get('ratings_offset'))
+        user_item_matrix, mappings, temporal = update_features(
+            df_window, previous_processed, save_path=processed_path, half_life_days=HALF_LIFE_DAYS,
+            ratings_offset=ratings_offset
+        )
+        if temporal is None:
+            discard_version(artifacts_root, version_id)
+            print(" Rien à ré-entraîner : la version publiée est à jour.")
+            return
+    else:
+        # ---------------------------------------------------------
+        # ÉTAPE 1 : ANALYSE GÉNÉRALE (Racine de reports/figures)
+        # ---------------------------------------------------------
+        print("\nÉTAPE 1 : Analyse Exploratoire")
+        # Taille de rating.csv relevée avant lecture : point de départ du prochain --incremental
+        ratings_offset = os.path.getsize(os.path.join(raw_path, 'rating.csv'))
+        df_raw = load_data(raw_data_path=raw_path)
+        
+        # Ces graphiques restent à la racine car ils concernent tout le dataset
+        plot_rating_distribution(df_raw, save_dir=figures_root)
+        plot_long_tail(df_raw, save_dir=figures_root)
+        print(f" Stats globales sauvegardées dans {figures_root}")
+
+        # ---------------------------------------------------------
+        # ÉTAPE 2 : TRANSFORMATION
+        # ---------------------------------------------------------
+        print("\nÉTAPE 2 : Préparation")
+        user_item_matrix, mappings, temporal = process_features(
+            df_raw, save_path=processed_path, raw_path=raw_path,
+            validation_ratio=VALIDATION_RATIO, half_life_days=HALF_LIFE_DAYS, return_temporal=True,
+            ratings_offset=ratings_offset
+        )
+    # Évaluation : les modèles ne voient que le passé, la validation contient les notes futures
+    train_matrix = temporal['train']
+    validation_matrix = temporal['validation']
+    cluster_matrix = temporal['recency'] if temporal['recency'] is not None else train_matrix
+    # Modèles publiés : toutes les notes, y compris la fenêtre la plus récente
+    full_cluster_matrix = temporal['recency_full'] if temporal['recency_full'] is not None else user_item_matrix
+    
     # ---------------------------------------------------------
-    # ÉTAPE 1 : ANALYSE GÉNÉRALE (Racine de reports/figures)
+    # ÉTAPE 3 : MODÈLE HYBRIDE (Dossier /kmeans)
     # ---------------------------------------------------------
-    print("\nÉTAPE 1 : Analyse Exploratoire")
-    df_raw = load_data(raw_data_path=raw_path)
+    print("\nÉTAPE 3 : Modèle K-Means")
     
-    # Ces graphiques restent à la racine car ils concernent tout le dataset
-    plot_rating_distribution(df_raw, save_dir=figures_root)
-    plot_long_tail(df_raw, save_dir=figures_root)
-    print(f" Stats globales sauvegardées dans {figures_root}")
+    # Rapports de choix de K : uniquement lors d'un ré-entraînement complet
+    if not incremental:
+        inertias = []
+        K_range = range(2, 10)
+        for k in K_range:
+            kmeans_test = MiniBatchKMeans(n_clusters=k, random_state=42, batch_size=2048, n_init=10)
+            kmeans_test.fit(train_matrix)
+            inertias.append(kmeans_test.inertia_)
+        
+        # On sauvegarde dans le sous-dossier kmeans
+        plot_elbow_curve(K_range, inertias, save_dir=kmeans_figs)
+        
+        # Compromis précision / latence selon K
+        # Même matrice de clustering que le modèle de production, référence KMeans K=4 incluse
+        tradeoff = evaluate_cluster_tradeoff(train_matrix, mappings['user_labels'],
+                                             mappings['movie_labels'], TRADEOFF_K_VALUES,
+                                             eval_matrix=validation_matrix, fit_matrix=cluster_matrix,
+                                             baseline_k=4)
+        tradeoff.to_csv(os.path.join(kmeans_figs, 'cluster_tradeoff.csv'), index=False)
+        plot_cluster_tradeoff(tradeoff, save_dir=kmeans_figs)
+
+    # Modèle d'évaluation (train uniquement) : sert au RMSE de validation temporelle
+    hybrid_eval = KMeansRecommender(n_clusters=HYBRID_N_CLUSTERS, backend='minibatch')
+    hybrid_eval.fit(cluster_matrix, mappings['user_labels'])
 
     # ---------------------------------------------------------
-    # ÉTAPE 2 : TRANSFORMATION
+    # ÉTAPE 4 : MODÈLE SVD (Dossier /svd)
     # ---------------------------------------------------------
-    print("\nÉTAPE 2 : Préparation")
-    user_item_matrix, mappings = process_features(df_raw, save_path=processed_path, raw_path=raw_path)
-    
+    print("\nÉTAPE 4 : Modèle SVD")
+    svd_eval = SVDRecommender(n_components=20)
+    svd_eval.fit(train_matrix)
+
+    # Évaluation sur la période de validation
+    user_to_idx = {u: i for i, u in enumerate(mappings['user_labels'])}
+    rmse_hybrid = calculate_rmse(hybrid_eval, 'hybrid', train_matrix, mappings['user_labels'],
+                                 user_to_idx, n_tests=200, eval_matrix=validation_matrix)
+    rmse_svd = calculate_rmse(svd_eval, 'svd', train_matrix, mappings['user_labels'],
+                              user_to_idx, n_tests=200, eval_matrix=validation_matrix)
+    print(f"   [Validation temporelle] RMSE Hybride : {rmse_hybrid:.4f} | RMSE SVD : {rmse_svd:.4f}")
+
     # ---------------------------------------------------------
-    # ÉTAPE 3 : MODÈLE HYBRIDE (Dossier /kmeans)
+    # ÉTAPE 4 bis : RÉ-ENTRAÎNEMENT SUR TOUTES LES NOTES (Modèles publiés)
     # ---------------------------------------------------------
-    print("\nÉTAPE 3 : Modèle K-Means")
-    
-    inertias = []
-    K_range = range(2, 10)
-    for k in K_range:
-        kmeans_test = MiniBatchKMeans(n_clusters=k, random_state=42, batch_size=2048, n_init=10)
-        kmeans_test.fit(user_item_matrix)
-        inertias.append(kmeans_test.inertia_)
-    
-    # On sauvegarde dans le sous-dossier kmeans
-    plot_elbow_curve(K_range, inertias, save_dir=kmeans_figs)
-    
-    hybrid_model = KMeansRecommender(n_clusters=4)
-    hybrid_model.fit(user_item_matrix, mappings['user_labels'])
+    print("\nÉTAPE 4 bis : Ré-entraînement des modèles publiés sur toutes les notes")
+    hybrid_model = KMeansRecommender(n_clusters=HYBRID_N_CLUSTERS, backend='minibatch')
+    hybrid_model.fit(full_cluster_matrix, mappings['user_labels'])
     hybrid_model.save(models_path)
     hybrid_model.clusters.to_csv(os.path.join(processed_path, 'user_clusters.csv'), index=False)
     
     # On sauvegarde dans le sous-dossier kmeans
     plot_clusters_2d(user_item_matrix, hybrid_model.model.labels_, save_dir=kmeans_figs)
 
-    # ---------------------------------------------------------
-    # ÉTAPE 4 : MODÈLE SVD (Dossier /svd)
-    # ---------------------------------------------------------
-    print("\nÉTAPE 4 : Modèle SVD")
     svd_model = SVDRecommender(n_components=20)
     svd_model.fit(user_item_matrix)
     svd_model.save(models_path)
@@ -104,9 +189,19 @@ def main():
     except FileNotFoundError:
         print("  Fichiers manquants pour Content-Based.")
     
+    # ---------------------------------------------------------
+    # ÉTAPE 6 : PUBLICATION ATOMIQUE
+    # ---------------------------------------------------------
+    print("\nÉTAPE 6 : Publication")
+    try:
+        publish_version(artifacts_root, version_id)
+    except (FileNotFoundError, ValueError) as e:
+        print(f"  Version non publiée (dossier de travail supprimé) : {e}")
+
     print("\n" + "="*60)
     print(f" Graphiques enregistré dans {figures_root}")
     
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    # python train.py --incremental : n'intègre que les notes postérieures à la version publiée
+    main(incremental='--incremental' in sys.argv)
\ No newline at end of file